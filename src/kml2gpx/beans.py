@@ -20,19 +20,64 @@ Definition of beans used across the project
 """
 
 import argparse
+import itertools
 import pathlib
+import sys
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    cast,
+)
 
-import gpxpy.gpx
+import numpy as np
 
 from . import __docformat__, __version__, __version_info__
 
-__all__ = ["TrackPoint", "AbstractInputHandler"]
+if TYPE_CHECKING:
+    # gpxpy is only loaded when building GPX objects
+    import gpxpy.gpx
 
+__all__ = ["TrackPoint", "TrackArray", "AbstractInputHandler", "to_datetime64"]
 
-@dataclass
+
+# Slotted data classes are only available from Python 3.10
+DATACLASS_SLOTS: Dict[str, Any] = (
+    {"slots": True} if sys.version_info >= (3, 10) else {}
+)
+
+
+def to_datetime64(value: datetime) -> np.datetime64:
+    """
+    Converts a date time to a UTC NumPy date time (naive values are UTC)
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return np.datetime64(value, "ns")
+
+
+def _format_decimals(values: np.ndarray) -> List[str]:
+    """
+    Formats floats as xsd:decimal strings, i.e. without exponent notation
+
+    :param values: Array of floats
+    :return: The text of each value
+    """
+    floats = values.tolist()
+    return [
+        text if "e" not in text else np.format_float_positional(value, trim="-")
+        for value, text in zip(floats, map(repr, floats))
+    ]
+
+
+@dataclass(**DATACLASS_SLOTS)
 class TrackPoint:
     longitude: float
     latitude: float
@@ -40,11 +85,135 @@ class TrackPoint:
     time: Optional[datetime] = None
 
     def to_gpx(self):
+        import gpxpy.gpx
+
         return gpxpy.gpx.GPXTrackPoint(
             self.latitude, self.longitude, self.altitude, self.time
         )
 
 
+@dataclass
+class TrackArray:
+    """
+    Track points stored as columns
+    """
+
+    longitude: np.ndarray
+    """ Longitudes of the points (float64) """
+
+    latitude: np.ndarray
+    """ Latitudes of the points (float64) """
+
+    altitude: np.ndarray
+    """ Altitudes of the points, in meters (float64) """
+
+    time: Optional[np.ndarray] = None
+    """ UTC times of the points (datetime64, any unit), NaT if unknown """
+
+    def __post_init__(self) -> None:
+        if self.time is None:
+            self.time = np.full(
+                len(self.longitude), np.datetime64("NaT"), "datetime64[ns]"
+            )
+
+    def __len__(self) -> int:
+        return len(self.longitude)
+
+    def __iter__(self) -> Iterator[TrackPoint]:
+        """
+        Iterates over the points of the track
+        """
+        return itertools.starmap(
+            TrackPoint,
+            zip(
+                self.longitude.tolist(),
+                self.latitude.tolist(),
+                self.altitude.tolist(),
+                self.datetimes(),
+            ),
+        )
+
+    def datetimes(self) -> List[Optional[datetime]]:
+        """
+        Returns the times of the points as UTC date times (None if unknown)
+        """
+        utc = timezone.utc
+        return [
+            time if time is None else time.replace(tzinfo=utc)
+            for time in cast(np.ndarray, self.time)
+            .astype("datetime64[us]")
+            .tolist()
+        ]
+
+    def write_gpx_segment(self, fd: TextIO) -> None:
+        """
+        Writes the track as a GPX track segment (trkseg element)
+
+        :param fd: Text file to write to
+        """
+        times = cast(np.ndarray, self.time)
+
+        # Only write fractions of seconds if necessary
+        known_times = times[~np.isnat(times)]
+        if (known_times == known_times.astype("datetime64[s]")).all():
+            unit = "s"
+        else:
+            unit = "ms"
+
+        time_tags = [
+            "" if time == "NaT" else f"<time>{time}</time>"
+            for time in np.datetime_as_string(
+                times, unit=unit, timezone="UTC"
+            ).tolist()
+        ]
+
+        ele_tags = [
+            "" if unknown else f"<ele>{alt}</ele>"
+            for alt, unknown in zip(
+                _format_decimals(self.altitude),
+                np.isnan(self.altitude).tolist(),
+            )
+        ]
+
+        fd.write("<trkseg>")
+        fd.writelines(
+            f'<trkpt lat="{lat}" lon="{lon}">{ele_tag}{time_tag}</trkpt>'
+            for lat, lon, ele_tag, time_tag in zip(
+                _format_decimals(self.latitude),
+                _format_decimals(self.longitude),
+                ele_tags,
+                time_tags,
+            )
+        )
+        fd.write("</trkseg>")
+
+    def to_gpx_points(self) -> List["gpxpy.gpx.GPXTrackPoint"]:
+        """
+        Converts the track to a list of GPX track points
+        """
+        import gpxpy.gpx
+
+        return list(
+            itertools.starmap(
+                gpxpy.gpx.GPXTrackPoint,
+                zip(
+                    self.latitude.tolist(),
+                    self.longitude.tolist(),
+                    self.altitude.tolist(),
+                    self.datetimes(),
+                ),
+            )
+        )
+
+    def to_gpx_segment(self) -> "gpxpy.gpx.GPXTrackSegment":
+        """
+        Converts the track to a GPX track segment
+        """
+        import gpxpy.gpx
+
+        return gpxpy.gpx.GPXTrackSegment(self.to_gpx_points())
+
+
 class AbstractInputHandler:
     """
     Abstract class of input handlers
@@ -81,8 +250,25 @@ class AbstractInputHandler:
         """
         return None
 
-    def to_gpx(self) -> gpxpy.gpx.GPXTrack:
+    def close(self) -> None:
         """
-        Converts the input to a GPX Track
+        Releases the resources used by the handler
+        """
+
+    def iter_segments(self) -> Iterator[TrackArray]:
+        """
+        Yields the track points of each segment of the input
         """
         raise NotImplementedError
+
+    def to_gpx(self) -> "gpxpy.gpx.GPXTrack":
+        """
+        Converts the input to a GPX Track
+        """
+        import gpxpy.gpx
+
+        gpx_track = gpxpy.gpx.GPXTrack()
+        gpx_track.segments.extend(
+            track.to_gpx_segment() for track in self.iter_segments()
+        )
+        return gpx_track
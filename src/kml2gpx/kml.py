@@ -20,74 +20,214 @@ Utility module to parse KML files
 """
 
 import argparse
+import contextlib
+import itertools
+import os
 import pathlib
-from datetime import datetime
-from typing import Dict, List, Optional, Union, cast
+import warnings
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import IO, Dict, Iterator, List, Optional, Union, cast
 
-import gpxpy
-import gpxpy.gpx
 import lxml.etree
+import numpy as np
 
 from . import __docformat__, __version__, __version_info__
-from .beans import AbstractInputHandler, TrackPoint
+from .beans import AbstractInputHandler, TrackArray, TrackPoint, to_datetime64
+
+KML_NS = "http://www.opengis.net/kml/2.2"
+""" KML 2.2 namespace """
+
+_TAG_KML = f"{{{KML_NS}}}kml"
+""" Qualified tag of the KML root element """
+
+_TAG_PLACEMARK = f"{{{KML_NS}}}Placemark"
+""" Qualified tag of KML placemarks """
+
+_NS = {"kml": KML_NS}
+""" Namespaces used in XPath expressions """
+
+_NAME_XPATH = lxml.etree.XPath("string(kml:name)", namespaces=_NS)
+""" Selects the name of a placemark """
+
+_ALT_MODE_XPATH = lxml.etree.XPath(
+    "(kml:LineString/kml:altitudeMode)[1]/text()",
+    namespaces=_NS,
+    smart_strings=False,
+)
+""" Selects the first altitude mode of a placemark """
+
+_COORDS_XPATH = lxml.etree.XPath(
+    "(kml:LineString/kml:coordinates)[1]/text()",
+    namespaces=_NS,
+    smart_strings=False,
+)
+""" Selects the first coordinates of a placemark """
+
+
+_ZIP_MAGIC = b"PK"
+""" First bytes of a ZIP archive, i.e. a KMZ file """
+
+_KMZ_MAIN_DOC = "doc.kml"
+""" Usual name of the main document in a KMZ file """
+
+
+@contextlib.contextmanager
+def open_kml(in_path: pathlib.Path) -> Iterator[IO[bytes]]:
+    """
+    Opens a KML file, or streams the main document of a KMZ file
+
+    :param in_path: Path to the KML or KMZ file
+    :return: A binary stream of the KML document
+    :raise TypeError: KMZ file without KML document
+    """
+    with open(in_path, "rb") as fd:
+        if fd.read(len(_ZIP_MAGIC)) != _ZIP_MAGIC:
+            fd.seek(0)
+            yield fd
+            return
+
+        with zipfile.ZipFile(fd) as archive:
+            names = [
+                name
+                for name in archive.namelist()
+                if name.lower().endswith(".kml")
+            ]
+            if not names:
+                raise TypeError("No KML document in KMZ file")
+
+            name = _KMZ_MAIN_DOC if _KMZ_MAIN_DOC in names else names[0]
+            with archive.open(name) as kml_fd:
+                yield kml_fd
 
 
 class KmlParser:
-    def __init__(self) -> None:
-        self.kml: Optional[lxml.etree._Element] = None
-
-    def load(self, in_path: pathlib.Path) -> None:
-        with open(in_path, "rb") as fd:
-            kml: lxml.etree._Element = lxml.etree.parse(fd, None).getroot()
-
-            root_ns = kml.nsmap[kml.prefix]
-            if root_ns != "http://www.opengis.net/kml/2.2":
-                raise TypeError("Not a valid/supported KML file")
-
-            self.kml = kml
-
-    def get_coordinates(
-        self, layer_name: str = "Altitude",
-    ) -> List[TrackPoint]:
-        if self.kml is None:
-            raise IOError("KML data not loaded yet")
-
-        nsmap: Dict[str, str] = self.kml.nsmap
-        for placemark in self.kml.findall("Placemark", nsmap):
-            placemark = cast(lxml.etree._Element, placemark)
-            name = placemark.findtext("name", None, nsmap)
-            if name == layer_name:
-                break
+    @staticmethod
+    def parse_coordinates(
+        in_path: pathlib.Path, layer_name: str = "Altitude"
+    ) -> TrackArray:
+        """
+        Streams the given KML (or KMZ) file and extracts the coordinates of a
+        layer
+
+        Placemarks are discarded as soon as they have been checked, so only
+        the one of the requested layer is kept in memory, and the parsed tree
+        is released before the coordinates are converted.
+
+        :param in_path: Path to the KML or KMZ file
+        :param layer_name: Name of the placemark to extract
+        :return: The coordinates of the layer
+        :raise TypeError: Not a KML file
+        :raise KeyError: Layer not found
+        :raise ValueError: Invalid layer content
+        """
+        with open_kml(in_path) as fd:
+            context = lxml.etree.iterparse(
+                fd,
+                events=("end",),
+                tag=_TAG_PLACEMARK,
+                remove_blank_text=True,
+                remove_comments=True,
+                remove_pis=True,
+                resolve_entities=False,
+                collect_ids=False,
+                huge_tree=False,
+            )
+            found: Optional[lxml.etree._Element] = None
+            for _, placemark in context:
+                if _NAME_XPATH(placemark) == layer_name:
+                    found = placemark
+                    break
+
+                # Free the skipped placemark and its previous siblings
+                placemark.clear()
+                while placemark.getprevious() is not None:
+                    del placemark.getparent()[0]
+
+        if found is None:
+            kml = context.root
         else:
+            kml = found.getroottree().getroot()
+
+        if kml.tag != _TAG_KML:
+            raise TypeError("Not a valid/supported KML file")
+
+        if found is None:
             raise KeyError(layer_name)
 
-        alt_mode = placemark.findtext("LineString/altitudeMode", None, nsmap)
+        alt_modes = _ALT_MODE_XPATH(found)
+        alt_mode = alt_modes[0] if alt_modes else None
         if alt_mode != "absolute":
             raise ValueError(f"Altitude mode is not absolute: {alt_mode}")
 
-        nodes = placemark.findall("LineString/coordinates", nsmap)
+        nodes = _COORDS_XPATH(found)
         if not nodes:
             raise ValueError(f"No nodes found in layer {layer_name}")
 
-        coords_list_raw: str = nodes[0].text
-        coords: List[TrackPoint] = []
-        for row in coords_list_raw.split(None):
-            row = row.strip()
-            if not row:
-                # Empty line
-                continue
+        # Plain strings don't reference the tree: drop it before conversion
+        coords_list_raw: str = nodes[0]
+        kml.clear()
+        del context, found, kml, nodes
+
+        # Rows of lon,lat,alt, stored as contiguous columns
+        lon, lat, alt = parse_coordinates_text(coords_list_raw).T.copy()
+        return TrackArray(lon, lat, alt)
+
+
+def parse_coordinates_text(coords_list_raw: str) -> np.ndarray:
+    """
+    Converts the content of a KML coordinates element to an array
+
+    :param coords_list_raw: Whitespace-separated lon,lat,alt rows
+    :return: A (N, 3) array of longitude, latitude and altitude rows
+    :raise ValueError: Invalid coordinates
+    """
+    # Each row must have exactly 3 fields
+    rows = coords_list_raw.split()
+    if not rows or not (np.char.count(rows, ",") == 2).all():
+        raise ValueError("Coordinates are not lon,lat,alt rows")
+
+    with warnings.catch_warnings():
+        # Older NumPy versions only warn about unparsable data
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            values = np.fromstring(
+                coords_list_raw.replace(",", " "), dtype=np.float64, sep=" "
+            )
+        except (ValueError, DeprecationWarning) as ex:
+            raise ValueError(f"Invalid coordinates: {ex}") from ex
+
+    if values.size != 3 * len(rows):
+        # Some fields are empty
+        raise ValueError("Coordinates are not lon,lat,alt rows")
 
-            str_values = row.strip().split(",")
-            if len(str_values) != 3:
-                raise ValueError("Not a lon,lat,alt row: ", row)
+    return values.reshape(-1, 3)
 
-            lon = float(str_values[0])
-            lat = float(str_values[1])
-            alt = float(str_values[2])
-            trk_pt = TrackPoint(lon, lat, alt)
-            coords.append(trk_pt)
 
-        return coords
+def _parse_one(
+    in_file: pathlib.Path,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    layer_name: str,
+) -> TrackArray:
+    """
+    Parses a KML file and spreads its points between the given times
+
+    Defined at module level to be usable in worker processes.
+
+    :raise ValueError: Invalid XML content
+    """
+    try:
+        file_coords = KmlParser.parse_coordinates(in_file, layer_name)
+    except lxml.etree.XMLSyntaxError as ex:
+        # The error log of lxml exceptions can't be sent back by workers
+        raise ValueError(f"{in_file}: {ex}") from None
+
+    if start_time is not None and end_time is not None:
+        KmlInputHandler.set_times(file_coords, start_time, end_time)
+
+    return file_coords
 
 
 class KmlInputHandler(AbstractInputHandler):
@@ -111,7 +251,7 @@ class KmlInputHandler(AbstractInputHandler):
         """
         One-line description of the handler
         """
-        return "KML input handler"
+        return "KML/KMZ input handler"
 
     def register_arguments(self, parser: argparse.ArgumentParser) -> None:
         """
@@ -124,16 +264,19 @@ class KmlInputHandler(AbstractInputHandler):
             type=pathlib.Path,
             action="extend",
             nargs="+",
-            help="Input KML file(s)",
+            help="Input KML or KMZ file(s)",
         )
         parser.add_argument(
             "--start",
             action="extend",
             nargs="*",
-            help="Start time of the files",
+            help="Start time of the files (a single value applies to all)",
         )
         parser.add_argument(
-            "--end", action="extend", nargs="*", help="End time of the files"
+            "--end",
+            action="extend",
+            nargs="*",
+            help="End time of the files (a single value applies to all)",
         )
         parser.add_argument(
             "--layer",
@@ -160,9 +303,28 @@ class KmlInputHandler(AbstractInputHandler):
         if not self.in_files:
             raise ValueError("No input file given.")
 
+        # List each parent directory once instead of checking every file
+        files_by_parent: Dict[pathlib.Path, List[pathlib.Path]] = {}
         for file in self.in_files:
-            if not file.exists():
-                raise ValueError(f"File not found: {file}")
+            files_by_parent.setdefault(file.parent, []).append(file)
+
+        for parent, files in files_by_parent.items():
+            if len(files) == 1:
+                # A single stat is cheaper than listing the directory
+                existing = set()
+            else:
+                try:
+                    with os.scandir(parent) as entries:
+                        existing = {
+                            entry.name for entry in entries if entry.is_file()
+                        }
+                except OSError:
+                    existing = set()
+
+            for file in files:
+                # Fall back to a direct check (case-insensitive file systems)
+                if file.name not in existing and not file.exists():
+                    raise ValueError(f"File not found: {file}")
 
         # Check times
         if len(raw_start_times) != len(raw_end_times):
@@ -171,10 +333,11 @@ class KmlInputHandler(AbstractInputHandler):
             )
 
         nb_files = len(self.in_files)
-        if (
-            len(raw_start_times) != nb_files
-            and len(raw_start_times) != nb_files
-        ):
+        if len(raw_start_times) == 1:
+            # Same time range for all files
+            raw_start_times = raw_start_times * nb_files
+            raw_end_times = raw_end_times * nb_files
+        elif raw_start_times and len(raw_start_times) != nb_files:
             raise ValueError("There must be as many start times as input files")
 
         if not raw_start_times:
@@ -196,42 +359,50 @@ class KmlInputHandler(AbstractInputHandler):
         """
         return self.in_files[0].with_suffix(".gpx")
 
-    def to_gpx(self) -> gpxpy.gpx.GPXTrack:
+    def iter_segments(self) -> Iterator[TrackArray]:
         """
-        Converts the input to a GPX Track
+        Yields the track points of each input file
         """
-        gpx_track = gpxpy.gpx.GPXTrack()
-
-        # Parse files
-        for in_file, start_time, end_time in zip(
-            self.in_files, self.start_times, self.end_times
-        ):
-            # Parse the KML file
-            kml = KmlParser()
-            kml.load(in_file)
-            file_coords = kml.get_coordinates(self.layer)
-
-            # Update times
-            if start_time is not None and end_time is not None:
-                self.set_times(file_coords, start_time, end_time)
+        args = (
+            self.in_files,
+            self.start_times,
+            self.end_times,
+            itertools.repeat(self.layer),
+        )
 
-            # Create the GPX segment
-            gpx_segment = gpxpy.gpx.GPXTrackSegment()
-            gpx_segment.points = [trk.to_gpx() for trk in file_coords]
-            gpx_track.segments.append(gpx_segment)
+        nb_workers = min(len(self.in_files), os.cpu_count() or 1)
+        if nb_workers == 1:
+            # Single file or single CPU: avoid the cost of worker processes
+            yield from map(_parse_one, *args)
+            return
 
-        return gpx_track
+        # Files are independent: parse them in parallel
+        with ProcessPoolExecutor(nb_workers) as executor:
+            yield from executor.map(_parse_one, *args)
 
     @staticmethod
     def set_times(
-        coords: List[TrackPoint], start_time: datetime, end_time: datetime
+        coords: Union[TrackArray, List[TrackPoint]],
+        start_time: datetime,
+        end_time: datetime,
     ):
         """
         Forces the update of the time field in the given track points, evenly
         spread between the start and end time
         """
-        time = start_time
-        time_delta = (end_time - start_time) / len(coords)
-        for coord in coords:
-            coord.time = time
-            time += time_delta
+        nb_points = len(coords)
+        if not nb_points:
+            return
+
+        start = to_datetime64(start_time)
+        time_delta = (to_datetime64(end_time) - start) // nb_points
+        times = start + np.arange(nb_points, dtype=np.int64) * time_delta
+
+        if isinstance(coords, TrackArray):
+            coords.time = times
+        else:
+            # List of track points
+            for coord, time in zip(
+                coords, times.astype("datetime64[us]").tolist()
+            ):
+                coord.time = time.replace(tzinfo=timezone.utc)
@@ -21,58 +21,89 @@ Converts Private-Radar KML files to GPX files usable in Ayvri
 
 import argparse
 import logging
+import os
 import pathlib
 import sys
-from typing import List, Optional, cast
-
-import gpxpy
-import gpxpy.gpx
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, cast
 
 from . import __docformat__, __version__, __version_info__
-from .beans import AbstractInputHandler
-from .kml import KmlInputHandler
-from .private_radar import PrivateRadarHandler
 
+if TYPE_CHECKING:
+    from .beans import AbstractInputHandler
 
-def main(args: Optional[List[str]] = None) -> int:
+GPX_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<gpx xmlns="http://www.topografix.com/GPX/1/1"'
+    ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+    ' xsi:schemaLocation="http://www.topografix.com/GPX/1/1'
+    ' http://www.topografix.com/GPX/1/1/gpx.xsd"'
+    ' version="1.1" creator="kml2gpx"><trk>'
+)
+""" Start of the GPX document, up to the track element """
+
+GPX_FOOTER = "</trk></gpx>\n"
+""" End of the GPX document """
+
+
+def _load_kml_handler() -> "AbstractInputHandler":
     """
-    Script entry point
+    Imports and instantiates the KML input handler
     """
-    # Known handlers
-    input_handlers: List[AbstractInputHandler] = [
-        KmlInputHandler(),
-        PrivateRadarHandler(),
-    ]
+    from .kml import KmlInputHandler
 
-    # Setup the arguments parser
-    parser = argparse.ArgumentParser("kml2gpx")
-    parser.add_argument("--version", action="version", version=__version__)
-    parser.add_argument(
-        "-v", "--verbose", action="store_true", help="Set logger to DEBUG level"
-    )
-    parser.add_argument(
-        "-o", "--output", type=pathlib.Path, help="Output GPX file"
-    )
+    return KmlInputHandler()
 
-    subparsers = parser.add_subparsers(
-        description="Input-based arguments", required=True
-    )
-    for handler in input_handlers:
-        sub_parser = subparsers.add_parser(
-            handler.get_id(), description=handler.get_description()
-        )
-        sub_parser.set_defaults(handler=handler)
-        handler.register_arguments(sub_parser)
 
-    # Parse arguments
-    options = parser.parse_args(args)
+def _load_private_radar_handler() -> "AbstractInputHandler":
+    """
+    Imports and instantiates the Private Radar input handler
+    """
+    from .private_radar import PrivateRadarHandler
+
+    return PrivateRadarHandler()
 
-    logging.basicConfig(
-        level=logging.DEBUG if options.verbose else logging.ERROR
-    )
 
-    # Get the handler
-    handler: AbstractInputHandler = options.handler
+INPUT_HANDLERS: Dict[str, Callable[[], "AbstractInputHandler"]] = {
+    "kml": _load_kml_handler,
+    "private-radar": _load_private_radar_handler,
+}
+""" Factories of the known input handlers, by sub-parser name """
+
+
+def write_gpx(output: pathlib.Path, handler: "AbstractInputHandler") -> None:
+    """
+    Streams the track of the given handler to a GPX file, one segment at a time
+
+    The track is written to a temporary file next to the output, which only
+    replaces the output file once the whole track has been converted.
+
+    :param output: Path to the output GPX file
+    :param handler: Input handler providing the track segments
+    """
+    tmp_output = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+    gpx_fd = open(tmp_output, "x", encoding="utf-8")
+    try:
+        with gpx_fd:
+            gpx_fd.write(GPX_HEADER)
+            for track in handler.iter_segments():
+                track.write_gpx_segment(gpx_fd)
+            gpx_fd.write(GPX_FOOTER)
+
+        os.replace(tmp_output, output)
+    except BaseException:
+        # Keep the previous output file, if any
+        tmp_output.unlink()
+        raise
+
+
+def run_handler(
+    handler: "AbstractInputHandler", options: argparse.Namespace
+) -> int:
+    """
+    Checks the arguments of the handler and writes its track to a GPX file
+
+    :return: The exit code of the script
+    """
     try:
         rc = handler.check_arguments(options)
         if rc is not None:
@@ -89,17 +120,60 @@ def main(args: Optional[List[str]] = None) -> int:
     if output is None:
         output = pathlib.Path("output.gpx")
 
-    # Prepare the root GPX structure
-    gpx = gpxpy.gpx.GPX()
-    gpx.tracks.append(handler.to_gpx())
-
     # Write the GPX file
-    with open(output, "w", encoding="utf-8") as gpx_fd:
-        gpx_fd.write(gpx.to_xml())
+    write_gpx(output, handler)
 
     print(output, "written successfully.")
     return 0
 
 
+def main(args: Optional[List[str]] = None) -> int:
+    """
+    Script entry point
+    """
+    # Setup the arguments parser
+    parser = argparse.ArgumentParser("kml2gpx")
+    parser.add_argument("--version", action="version", version=__version__)
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Set logger to DEBUG level"
+    )
+    parser.add_argument(
+        "-o", "--output", type=pathlib.Path, help="Output GPX file"
+    )
+
+    # Handlers arguments are registered once the handler has been selected,
+    # to avoid loading the modules of all handlers
+    subparsers = parser.add_subparsers(
+        description="Input-based arguments",
+        dest="handler_id",
+        metavar="{" + ",".join(INPUT_HANDLERS) + "}",
+        required=True,
+    )
+    for handler_id in INPUT_HANDLERS:
+        subparsers.add_parser(handler_id, add_help=False)
+
+    # Parse arguments
+    options, handler_args = parser.parse_known_args(args)
+
+    # Load the selected handler and parse its arguments
+    handler = INPUT_HANDLERS[options.handler_id]()
+    sub_parser = argparse.ArgumentParser(
+        f"{parser.prog} {options.handler_id}",
+        description=handler.get_description(),
+    )
+    handler.register_arguments(sub_parser)
+    sub_parser.parse_args(handler_args, options)
+
+    logging.basicConfig(
+        level=logging.DEBUG if options.verbose else logging.ERROR
+    )
+
+    try:
+        return run_handler(handler, options)
+    finally:
+        # Release the resources of the handler
+        handler.close()
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -23,20 +23,26 @@ import argparse
 import configparser
 import logging
 import pathlib
-from configparser import SafeConfigParser
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union, cast
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Union, cast
 from urllib.parse import urljoin
 
-import gpxpy.gpx
+import numpy as np
+import orjson
 import requests
 
 from . import __docformat__, __version__, __version_info__
-from .beans import AbstractInputHandler, TrackPoint
+from .beans import DATACLASS_SLOTS, AbstractInputHandler, TrackArray
 
+_PR_FLIGHT_DETAILS = itemgetter(
+    "id", "registration", "from", "to", "flight_type"
+)
+""" Extracts the flight details kept as is from its JSON description """
 
-@dataclass
+
+@dataclass(**DATACLASS_SLOTS)
 class PRFlight:
     """
     Description of a Private Radar flight
@@ -85,17 +91,7 @@ class PRFlight:
         ]
 
         # Get the rest of details as is
-        return cls(
-            data["id"],
-            data["registration"],
-            data["from"],
-            data["to"],
-            data["flight_type"],
-            start,
-            end,
-            crew,
-            data["starred"],
-        )
+        return cls(*_PR_FLIGHT_DETAILS(data), start, end, crew, data["starred"])
 
 
 class PrivateRadar:
@@ -112,6 +108,21 @@ class PrivateRadar:
         self.auth = auth
         self.logger = logging.getLogger(__name__)
 
+        # Reuse connections across requests
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "Authorization": auth,
+                "Accept": "application/json, text/plain, */*",
+            }
+        )
+
+    def close(self) -> None:
+        """
+        Closes the connections to Private Radar
+        """
+        self.session.close()
+
     def list_flights(
         self, nb_flights: int = 100, flight_id: Optional[int] = None
     ) -> List[PRFlight]:
@@ -155,12 +166,8 @@ class PrivateRadar:
         }
 
         # Query the list
-        response = requests.post(
+        response = self.session.post(
             urljoin(self.base_url, "/prwsw/flight/getFlightsFilter6"),
-            headers={
-                "Authorization": self.auth,
-                "Accept": "application/json, text/plain, */*",
-            },
             json=params,
         )
         try:
@@ -170,16 +177,14 @@ class PrivateRadar:
             raise ex
 
         # Parse flights
-        result = cast(Dict[str, Any], response.json())
+        result = cast(Dict[str, Any], orjson.loads(response.content))
 
         if result["status"] != "success":
             error = result.get("error", "n/a")
             self.logger.error(f"Error retrieving flights: {error}")
             raise IOError(f"Error retrieving flights: {error}")
 
-        with open("out.json", "w") as fd:
-            fd.write(response.text)
-        flights_json: List[Dict[str, Any]] = response.json()["flight_list"]
+        flights_json: List[Dict[str, Any]] = result["flight_list"]
         return [PRFlight.parse(flight) for flight in flights_json]
 
     def get_flight(self, flight_id: int) -> PRFlight:
@@ -195,7 +200,7 @@ class PrivateRadar:
             nb_flights = abs(flight_id)
             return self.list_flights(nb_flights)[abs(flight_id) - 1]
 
-    def flight_path(self, flight: Union[int, PRFlight]) -> List[TrackPoint]:
+    def flight_path(self, flight: Union[int, PRFlight]) -> TrackArray:
         """
         Retrieves the path of the given Private Radar path
         """
@@ -207,12 +212,8 @@ class PrivateRadar:
             raise TypeError(f"Invalid flight ID: {type(flight).__name__}")
 
         # Get the flight
-        response = requests.post(
+        response = self.session.post(
             urljoin(self.base_url, "/prwsw/flight/get_path"),
-            headers={
-                "Authorization": self.auth,
-                "Accept": "application/json, text/plain, */*",
-            },
             json={"id": flight_id},
         )
         try:
@@ -223,8 +224,13 @@ class PrivateRadar:
             )
             raise ex
 
+        # Decode the payload, then release it before building the track, to
+        # avoid holding both the raw and the decoded path in memory
+        flight_details: Dict[str, Any] = orjson.loads(response.content)
+        response.close()
+        del response
+
         # Check its content
-        flight_details: Dict[str, Any] = response.json()
         if flight_details.get("status") != "success":
             self.logger.error("Error getting flight %d", flight_id)
             self.logger.debug("Flight details:\n%s", flight_details)
@@ -232,16 +238,21 @@ class PrivateRadar:
 
         # Parse the flight track
         path: List[Dict[str, Any]] = flight_details["flight_profile"]
-        return [
-            TrackPoint(
-                node["lon"],
-                node["lat"],
-                node["alt_m"],
-                # Convert Private Radar timestamps
-                datetime.fromtimestamp(node["time"] * 10 ** -3),
-            )
-            for node in path
-        ]
+        nb_nodes = len(path)
+
+        def column(key: str, dtype: Any) -> np.ndarray:
+            """
+            Extracts a field of all path nodes, without a Python-level loop
+            """
+            return np.fromiter(map(itemgetter(key), path), dtype, nb_nodes)
+
+        return TrackArray(
+            column("lon", np.float64),
+            column("lat", np.float64),
+            column("alt_m", np.float64),
+            # Private Radar timestamps are in milliseconds since epoch
+            column("time", np.int64).view("datetime64[ms]"),
+        )
 
 
 class PrivateRadarHandler(AbstractInputHandler):
@@ -306,12 +317,8 @@ class PrivateRadarHandler(AbstractInputHandler):
         """
         Tries to find a path for the configuration file in well-known folders
         """
-        for folder in (
-            pathlib.Path("."),
-            pathlib.Path("~"),
-            pathlib.Path("~/.conf"),
-        ):
-            folder = folder.expanduser()
+        home = pathlib.Path.home()
+        for folder in (pathlib.Path("."), home, home / ".conf"):
             for name in ("kml2gpx.ini", "private_radar.ini"):
                 conf_path = folder / name
                 if conf_path.exists():
@@ -338,10 +345,10 @@ class PrivateRadarHandler(AbstractInputHandler):
                 raise ValueError(f"Configuration file not found: {conf_path}")
 
             conf_path = conf_path.absolute()
-            config = SafeConfigParser()
-            with open(conf_path, "r") as fd:
-                self.logger.debug("Reading configuration file: %s", conf_path)
-                config.read_file(fd)
+            config = configparser.ConfigParser()
+            self.logger.debug("Reading configuration file: %s", conf_path)
+            if not config.read(conf_path, encoding="utf-8"):
+                raise ValueError(f"Cannot read configuration file: {conf_path}")
 
             try:
                 url = config.get("PRIVATE_RADAR", "url")
@@ -394,9 +401,17 @@ class PrivateRadarHandler(AbstractInputHandler):
             f"{self.flight.to_icao}.gpx"
         )
 
-    def to_gpx(self) -> gpxpy.gpx.GPXTrack:
+    def close(self) -> None:
         """
-        Converts the input to a GPX Track
+        Releases the resources used by the handler
+        """
+        if self.api is not None:
+            self.api.close()
+            self.api = None
+
+    def iter_segments(self) -> Iterator[TrackArray]:
+        """
+        Yields the track points of the flight
         """
         if self.api is None:
             raise ValueError("Private Radar API not set up")
@@ -404,14 +419,7 @@ class PrivateRadarHandler(AbstractInputHandler):
         if self.flight is None:
             raise ValueError("Flight not loaded.")
 
-        gpx_segment = gpxpy.gpx.GPXTrackSegment()
-        gpx_segment.points = [
-            point.to_gpx() for point in self.api.flight_path(self.flight)
-        ]
-
-        gpx_track = gpxpy.gpx.GPXTrack()
-        gpx_track.segments.append(gpx_segment)
-        return gpx_track
+        yield self.api.flight_path(self.flight)
 
     def print_flights(self, nb_flights: int) -> int:
         """